@@ -1,39 +1,119 @@
 import streamlit as st
 import pandas as pd
-from datetime import datetime, date
-import plotly.express as px
-import plotly.graph_objects as go
+import numpy as np
+from datetime import datetime
 import hashlib
+import hmac
+import io
 import os
 import json
+import stat
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional; sem ele usamos o json padrão
+    orjson = None
 
 # Arquivos de dados
 ARQUIVO_USUARIOS = "usuarios.json"
 ARQUIVO_LOGIN_SALVO = "login_salvo.json"
 PASTA_DADOS = "dados_usuarios"
 
-def hash_senha(senha):
-    """Cria hash da senha para segurança"""
+# Formatação de moeda feita no navegador, sem Styler rodando por célula no servidor
+COLUNAS_RESUMO = {"Total (R$)": st.column_config.NumberColumn("Total (R$)", format="R$ %.2f")}
+
+# Faixas de % da meta diária e o indicador de cada uma (<50, <75, <100, atingida)
+FAIXAS_META = np.array([50.0, 75.0, 100.0])
+STATUS_META = np.array(["🔴", "🟠", "🟡", "🟢"])
+
+# Modelo de tabela vazia já tipada (sempre usar .copy())
+DADOS_VAZIOS = pd.DataFrame({
+    "Data": pd.Series(dtype="datetime64[ns]"),
+    "Valor": pd.Series(dtype="float64")
+})
+
+def ler_json(caminho_arquivo):
+    """Lê um arquivo JSON (orjson quando disponível)"""
+    if orjson is not None:
+        with open(caminho_arquivo, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(caminho_arquivo, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def gravar_atomico(caminho_arquivo, conteudo):
+    """Grava bytes num temporário único da mesma pasta e troca de uma vez"""
+    # Nome exclusivo por chamada: sessões simultâneas não escrevem no mesmo temporário.
+    # Criado com 0o666 como um open() comum, então o umask define a permissão de arquivos novos.
+    caminho_tmp = f"{caminho_arquivo}.{os.urandom(6).hex()}.tmp"
+    fd = os.open(caminho_tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0), 0o666)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(conteudo)
+            f.flush()
+            os.fsync(f.fileno())  # dados no disco antes da troca
+        # Arquivo já existente mantém a permissão que tinha
+        try:
+            os.chmod(caminho_tmp, stat.S_IMODE(os.stat(caminho_arquivo).st_mode))
+        except FileNotFoundError:
+            pass
+        os.replace(caminho_tmp, caminho_arquivo)
+    except BaseException:
+        os.remove(caminho_tmp)
+        raise
+
+def gravar_parquet(caminho_arquivo, df):
+    """Grava a tabela de rendimentos em Parquet pelo mesmo caminho atômico"""
+    buffer = io.BytesIO()
+    df.to_parquet(buffer, engine="pyarrow", compression="snappy", index=False)
+    gravar_atomico(caminho_arquivo, buffer.getvalue())
+
+def gravar_json(caminho_arquivo, dados):
+    """Grava um arquivo JSON indentado (orjson quando disponível)"""
+    if orjson is not None:
+        conteudo = orjson.dumps(dados, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    else:
+        conteudo = json.dumps(dados, ensure_ascii=False, indent=2).encode('utf-8')
+    gravar_atomico(caminho_arquivo, conteudo)
+
+def versao_arquivo(caminho_arquivo):
+    """(mtime em ns, tamanho) do arquivo; muda sempre que ele é regravado"""
+    info = os.stat(caminho_arquivo)
+    return info.st_mtime_ns, info.st_size
+
+def hash_senha(senha, salt):
+    """Cria hash da senha com scrypt e o salt (hex) do usuário"""
+    return hashlib.scrypt(senha.encode(), salt=bytes.fromhex(salt), n=2**14, r=8, p=1, dklen=32).hex()
+
+def hash_senha_legado(senha):
+    """SHA-256 sem salt das contas antigas; usado só para conferir o login antes da migração"""
     return hashlib.sha256(senha.encode()).hexdigest()
 
+@st.cache_data(show_spinner=False)
+def _ler_usuarios(caminho_arquivo, versao):
+    """Lê o JSON de usuários (versao só entra na chave do cache)"""
+    return ler_json(caminho_arquivo)
+
 def carregar_usuarios():
     """Carrega lista de usuários do arquivo JSON"""
     try:
-        with open(ARQUIVO_USUARIOS, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return _ler_usuarios(ARQUIVO_USUARIOS, versao_arquivo(ARQUIVO_USUARIOS))
     except FileNotFoundError:
         return {}
 
 def salvar_usuarios(usuarios):
     """Salva lista de usuários no arquivo JSON"""
-    with open(ARQUIVO_USUARIOS, 'w', encoding='utf-8') as f:
-        json.dump(usuarios, f, ensure_ascii=False, indent=2)
+    gravar_json(ARQUIVO_USUARIOS, usuarios)
+    _ler_usuarios.clear()
+
+@st.cache_data(show_spinner=False)
+def _ler_login_salvo(caminho_arquivo, versao):
+    """Lê o JSON do login salvo (versao só entra na chave do cache)"""
+    return ler_json(caminho_arquivo)
 
 def carregar_login_salvo():
     """Carrega dados do último login salvo"""
     try:
-        with open(ARQUIVO_LOGIN_SALVO, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return _ler_login_salvo(ARQUIVO_LOGIN_SALVO, versao_arquivo(ARQUIVO_LOGIN_SALVO))
     except FileNotFoundError:
         return {"usuario": "", "lembrar": False}
 
@@ -43,8 +123,11 @@ def salvar_login(nome_usuario, lembrar):
         "usuario": nome_usuario if lembrar else "",
         "lembrar": lembrar
     }
-    with open(ARQUIVO_LOGIN_SALVO, 'w', encoding='utf-8') as f:
-        json.dump(dados_login, f, ensure_ascii=False, indent=2)
+    # Só regrava quando o conteúdo muda (o padrão já cobre o arquivo inexistente)
+    if carregar_login_salvo() == dados_login:
+        return
+    gravar_json(ARQUIVO_LOGIN_SALVO, dados_login)
+    _ler_login_salvo.clear()
 
 def criar_usuario(nome_usuario, senha, nome_completo):
     """Cria novo usuário"""
@@ -53,11 +136,12 @@ def criar_usuario(nome_usuario, senha, nome_completo):
     if nome_usuario in usuarios:
         return False, "Usuário já existe!"
     
+    salt = os.urandom(16).hex()
     usuarios[nome_usuario] = {
-        "senha": hash_senha(senha),
+        "senha": hash_senha(senha, salt),
+        "salt": salt,
         "nome_completo": nome_completo,
-        "data_criacao": datetime.now().isoformat(),
-        "meta_diaria": 0.0  # Meta diária padrão
+        "data_criacao": datetime.now().isoformat()
     }
     
     salvar_usuarios(usuarios)
@@ -69,61 +153,119 @@ def criar_usuario(nome_usuario, senha, nome_completo):
     return True, "Usuário criado com sucesso!"
 
 def verificar_login(nome_usuario, senha):
-    """Verifica se login está correto"""
+    """Verifica se login está correto; em caso de sucesso devolve também o registro do usuário"""
     usuarios = carregar_usuarios()
     
     if nome_usuario not in usuarios:
-        return False, "Usuário não encontrado!"
+        return False, "Usuário não encontrado!", None
     
-    if usuarios[nome_usuario]["senha"] != hash_senha(senha):
-        return False, "Senha incorreta!"
+    usuario = usuarios[nome_usuario]
+    salt = usuario.get("salt")
     
-    return True, "Login realizado com sucesso!"
+    # Comparação em tempo constante
+    hash_informado = hash_senha(senha, salt) if salt is not None else hash_senha_legado(senha)
+    if not hmac.compare_digest(usuario["senha"], hash_informado):
+        return False, "Senha incorreta!", None
+    
+    # Conta antiga (SHA-256 sem salt): regrava com scrypt no primeiro login válido
+    if salt is None:
+        usuario["salt"] = os.urandom(16).hex()
+        usuario["senha"] = hash_senha(senha, usuario["salt"])
+        salvar_usuarios(usuarios)
+    
+    return True, "Login realizado com sucesso!", usuario
+
+def get_caminho_meta_usuario(nome_usuario):
+    """Retorna caminho do arquivo com a meta diária do usuário"""
+    return os.path.join(PASTA_DADOS, nome_usuario, "meta.txt")
 
 def get_meta_diaria(nome_usuario):
     """Retorna a meta diária do usuário"""
-    usuarios = carregar_usuarios()
-    if nome_usuario in usuarios:
-        return usuarios[nome_usuario].get("meta_diaria", 0.0)
-    return 0.0
+    try:
+        with open(get_caminho_meta_usuario(nome_usuario), encoding="utf-8") as f:
+            return float(f.read())
+    except (FileNotFoundError, ValueError):
+        # Contas antigas ainda guardam a meta em usuarios.json
+        return carregar_usuarios().get(nome_usuario, {}).get("meta_diaria", 0.0)
 
 def definir_meta_diaria(nome_usuario, meta):
     """Define a meta diária do usuário"""
-    usuarios = carregar_usuarios()
-    if nome_usuario in usuarios:
-        usuarios[nome_usuario]["meta_diaria"] = meta
-        salvar_usuarios(usuarios)
-        return True
-    return False
+    if nome_usuario not in carregar_usuarios():
+        return False
+    # Arquivo próprio por usuário: não regrava usuarios.json a cada alteração de meta
+    caminho_arquivo = get_caminho_meta_usuario(nome_usuario)
+    os.makedirs(os.path.dirname(caminho_arquivo), exist_ok=True)
+    gravar_atomico(caminho_arquivo, repr(float(meta)).encode("utf-8"))
+    return True
 
 def get_caminho_dados_usuario(nome_usuario):
     """Retorna caminho do arquivo de dados do usuário"""
     pasta_usuario = os.path.join(PASTA_DADOS, nome_usuario)
-    return os.path.join(pasta_usuario, "rendimentos.csv")
+    return os.path.join(pasta_usuario, "rendimentos.parquet")
+
+def migrar_csv_legado(nome_usuario):
+    """Converte o antigo rendimentos.csv do usuário para Parquet (o CSV fica como .bak)"""
+    caminho_parquet = get_caminho_dados_usuario(nome_usuario)
+    caminho_csv = os.path.splitext(caminho_parquet)[0] + ".csv"
+    if os.path.exists(caminho_csv) and not os.path.exists(caminho_parquet):
+        df = pd.read_csv(caminho_csv, parse_dates=["Data"], dtype={"Valor": "float64"})
+        gravar_parquet(caminho_parquet, df)
+        
+        # Confere o Parquet gravado antes de tirar o CSV do lugar
+        try:
+            lido = pd.read_parquet(caminho_parquet, engine="pyarrow")
+            iguais = (
+                list(lido.columns) == list(df.columns)
+                and len(lido) == len(df)
+                and all(lido[coluna].equals(df[coluna]) for coluna in df.columns)
+            )
+            if not iguais:
+                raise ValueError("o Parquet gravado não confere com o CSV")
+        except Exception:
+            os.remove(caminho_parquet)
+            raise
+        os.replace(caminho_csv, caminho_csv + ".bak")
+
+@st.cache_data(show_spinner=False)
+def _ler_rendimentos(caminho_arquivo, versao):
+    """Lê o arquivo de rendimentos (versao só entra na chave do cache)"""
+    return pd.read_parquet(caminho_arquivo, engine="pyarrow", columns=["Data", "Valor"])
 
 def carregar_dados_usuario(nome_usuario):
     """Carrega dados específicos do usuário"""
+    caminho_arquivo = get_caminho_dados_usuario(nome_usuario)
+    if not os.path.exists(caminho_arquivo):
+        # Falha na migração não pode virar "sem dados": o primeiro registro novo
+        # criaria o Parquet e esconderia o CSV antigo para sempre
+        try:
+            migrar_csv_legado(nome_usuario)
+        except Exception as erro:
+            st.error(f"❌ Não foi possível converter os rendimentos antigos (rendimentos.csv): {erro}. "
+                     "O arquivo foi mantido sem alterações.")
+            st.stop()
+        # Usuário novo: nem Parquet nem CSV, não há o que ler
+        if not os.path.exists(caminho_arquivo):
+            return DADOS_VAZIOS.copy()
     try:
-        caminho_arquivo = get_caminho_dados_usuario(nome_usuario)
-        df = pd.read_csv(caminho_arquivo, parse_dates=["Data"])
-        if "Data" not in df.columns or "Valor" not in df.columns:
-            return pd.DataFrame(columns=["Data", "Valor"])
-        return df
+        return _ler_rendimentos(caminho_arquivo, versao_arquivo(caminho_arquivo))
     except Exception:
-        return pd.DataFrame(columns=["Data", "Valor"])
+        return DADOS_VAZIOS.copy()
 
 def salvar_dados_usuario(nome_usuario, df):
     """Salva dados específicos do usuário"""
     if not df.empty and {"Data", "Valor"}.issubset(df.columns):
-        # Garantir que as datas são válidas antes de salvar
-        df = df.copy()
-        df["Data"] = pd.to_datetime(df["Data"], errors="coerce")
-        df = df.dropna(subset=["Data"])
+        # Parquet guarda datetime64 nativo; só converte o que veio como texto/objeto.
+        # Cada passo só gera uma nova tabela quando realmente há algo a mudar.
+        if df["Data"].dtype.kind != "M":
+            df = df.assign(Data=pd.to_datetime(df["Data"], errors="coerce"))
+        if df["Data"].hasnans:
+            df = df.dropna(subset=["Data"])
         
         if not df.empty:
             caminho_arquivo = get_caminho_dados_usuario(nome_usuario)
             os.makedirs(os.path.dirname(caminho_arquivo), exist_ok=True)
-            df.to_csv(caminho_arquivo, index=False)
+            gravar_parquet(caminho_arquivo, df)
+            _ler_rendimentos.clear()
             return True
         else:
             st.warning("⚠️ Nenhum dado válido para salvar.")
@@ -132,14 +274,30 @@ def salvar_dados_usuario(nome_usuario, df):
         st.warning("⚠️ Dados inválidos ou vazios — nada foi salvo.")
         return False
 
+def persistir_edicoes(nome_usuario, df_ativos):
+    """Grava o resultado do editor; sem linhas restantes, deixa o arquivo vazio"""
+    if not df_ativos.empty:
+        return salvar_dados_usuario(nome_usuario, df_ativos)
+    
+    caminho_arquivo = get_caminho_dados_usuario(nome_usuario)
+    gravar_parquet(caminho_arquivo, DADOS_VAZIOS)
+    _ler_rendimentos.clear()
+    return True
+
+def assinatura_dados(df):
+    """Hash vetorizado do conteúdo, usado para detectar se algo mudou"""
+    return int(pd.util.hash_pandas_object(df[["Data", "Valor"]], index=False).sum())
+
 def calcular_progresso_meta(df, meta_diaria):
     """Calcula o progresso da meta diária"""
     if df.empty or meta_diaria <= 0:
         return {}
     
-    hoje = date.today()
-    df_hoje = df[df["Data"].dt.date == hoje]
-    total_hoje = df_hoje["Valor"].sum() if not df_hoje.empty else 0
+    # Intervalo [hoje, amanhã) comparado direto no datetime64, sem objeto date por linha
+    hoje = pd.Timestamp.today().normalize()
+    amanha = hoje + pd.Timedelta(days=1)
+    mascara_hoje = (df["Data"] >= hoje) & (df["Data"] < amanha)
+    total_hoje = float(df.loc[mascara_hoje, "Valor"].sum())
     
     progresso = (total_hoje / meta_diaria) * 100
     falta = meta_diaria - total_hoje
@@ -152,12 +310,94 @@ def calcular_progresso_meta(df, meta_diaria):
         "atingida": total_hoje >= meta_diaria
     }
 
+@st.cache_data(show_spinner=False)
+def calcular_resumos(df):
+    """Agrupa os rendimentos por dia, semana e mês"""
+    # Um único groupby percorre todos os registros (chave inteira datetime64[D]);
+    # semana e mês saem do resultado diário, que tem no máximo uma linha por dia
+    resumo_dia = df.groupby(df["Data"].values.astype("datetime64[D]"))["Valor"].sum().reset_index()
+    resumo_dia.columns = ["Data", "Total (R$)"]
+    datas = resumo_dia["Data"].dt
+
+    resumo_semana = resumo_dia.groupby(datas.isocalendar().week)["Total (R$)"].sum().reset_index()
+    resumo_semana.columns = ["Semana", "Total (R$)"]
+
+    resumo_mes = resumo_dia.groupby((datas.year * 100 + datas.month).astype(np.int32))["Total (R$)"].sum().reset_index()
+    resumo_mes.columns = ["Mês", "Total (R$)"]
+    # Só o resultado final (um registro por mês) vira texto "AAAA-MM"
+    resumo_mes["Mês"] = resumo_mes["Mês"].map(lambda m: f"{m // 100}-{m % 100:02d}")
+
+    resumo_dia["Mês"] = datas.to_period("M")
+    resumo_dia["Data"] = datas.date
+
+    return resumo_dia, resumo_semana, resumo_mes
+
+@st.cache_data(show_spinner=False)
+def grafico_diario(resumo_dia_mes, mes_selecionado, meta_diaria):
+    """Gráfico diário do mês com linha de meta"""
+    import plotly.express as px  # import tardio: a tela de login não usa plotly
+    fig = px.line(
+        resumo_dia_mes,
+        x="Data",
+        y="Total (R$)",
+        title=f"Rendimento Diário em {mes_selecionado}",
+        labels={"Data": "Data", "Total (R$)": "Total (R$)"},
+        render_mode="webgl"
+    )
+    fig.update_traces(mode="lines+markers")
+    
+    # Adicionar linha de meta se definida
+    if meta_diaria > 0:
+        fig.add_hline(
+            y=meta_diaria,
+            line_dash="dash",
+            line_color="red",
+            annotation_text=f"Meta Diária: R$ {meta_diaria:.2f}"
+        )
+    
+    fig.update_layout(yaxis_title="Total (R$)", xaxis_title="Data", xaxis_tickformat="%d/%m/%Y", uirevision="keep")
+    return fig
+
+@st.cache_data(show_spinner=False)
+def grafico_semanal(resumo_semana):
+    """Gráfico de rendimento por semana do ano"""
+    import plotly.express as px
+    fig = px.line(
+        resumo_semana,
+        x="Semana",
+        y="Total (R$)",
+        title="Rendimento Semanal",
+        labels={"Semana": "Semana do Ano", "Total (R$)": "Total (R$)"},
+        render_mode="webgl"
+    )
+    fig.update_traces(mode="markers+lines")
+    fig.update_layout(uirevision="keep")
+    return fig
+
+@st.cache_data(show_spinner=False)
+def grafico_mensal(resumo_mes):
+    """Gráfico de barras com o total de cada mês"""
+    import plotly.express as px
+    fig = px.bar(
+        resumo_mes,
+        x="Mês",
+        y="Total (R$)",
+        title="Rendimento Mensal",
+        labels={"Mês": "Mês", "Total (R$)": "Total (R$)"},
+        text="Total (R$)"
+    )
+    fig.update_traces(texttemplate="R$ %{text:.2f}", textposition="outside")
+    fig.update_layout(yaxis_title="Total (R$)", xaxis_title="Mês")
+    return fig
+
 def tela_login():
     """Tela de login e cadastro"""
     st.title("🔐 Sistema de Controle de Rendimentos")
     
-    # Carregar dados de login salvos
-    login_salvo = carregar_login_salvo()
+    # Carregar dados de login salvos (uma vez por sessão, não a cada rerun)
+    if "login_salvo" not in st.session_state:
+        st.session_state.login_salvo = carregar_login_salvo()
+    login_salvo = st.session_state.login_salvo
     
     tab1, tab2 = st.tabs(["Login", "Cadastro"])
     
@@ -172,15 +412,15 @@ def tela_login():
             
             if botao_login:
                 if nome_usuario and senha:
-                    sucesso, mensagem = verificar_login(nome_usuario, senha)
+                    sucesso, mensagem, usuario = verificar_login(nome_usuario, senha)
                     if sucesso:
                         # Salvar login se solicitado
                         salvar_login(nome_usuario, lembrar_login)
+                        st.session_state.pop("login_salvo", None)
                         
                         st.session_state.logado = True
                         st.session_state.usuario_atual = nome_usuario
-                        usuarios = carregar_usuarios()
-                        st.session_state.nome_completo = usuarios[nome_usuario]["nome_completo"]
+                        st.session_state.nome_completo = usuario["nome_completo"]
                         st.success(mensagem)
                         st.rerun()
                     else:
@@ -216,6 +456,82 @@ def tela_login():
                 else:
                     st.warning("Por favor, preencha todos os campos!")
 
+def mostrar_totais(df):
+    """Mostra estatísticas rápidas dos rendimentos"""
+    total_registros = len(df)
+    total_valor = df["Valor"].sum()
+    st.metric("📊 Total de Registros", total_registros)
+    st.metric("💰 Total Acumulado", f"R$ {total_valor:.2f}")
+
+@st.fragment
+def acoes_rendimentos(df_ativos, itens_excluir, df):
+    """Botões de salvar/excluir e totais, sem recarregar os gráficos"""
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        if st.button("💾 Salvar alterações", key="salvar_alteracoes"):
+            # df_ativos já chega com as datas validadas
+            if assinatura_dados(df_ativos) == assinatura_dados(df):
+                st.toast("ℹ️ Nenhuma alteração para salvar.")
+            elif not df_ativos.empty:
+                if salvar_dados_usuario(st.session_state.usuario_atual, df_ativos):
+                    st.success("✅ Alterações salvas com sucesso!")
+                    st.rerun()
+            else:
+                st.warning("⚠️ Nenhum dado válido para salvar.")
+
+    with col2:
+        if st.button("🗑️ Excluir selecionados", key="excluir_selecionados"):
+            if itens_excluir > 0:
+                if persistir_edicoes(st.session_state.usuario_atual, df_ativos):
+                    if df_ativos.empty:
+                        st.success("✅ Todos os registros foram excluídos!")
+                    else:
+                        st.success(f"✅ {itens_excluir} registro(s) excluído(s) com sucesso!")
+                    st.rerun()
+            else:
+                st.warning("⚠️ Nenhum item selecionado para exclusão.")
+
+    with col3:
+        mostrar_totais(df)
+
+@st.fragment
+def resumo_diario_do_mes(resumo_dia, nova_meta):
+    """Seletor de mês com a tabela e o gráfico diário"""
+    meses_disponiveis = sorted(resumo_dia["Mês"].unique(), reverse=True)
+    mes_selecionado = st.selectbox("Selecione o mês para ver o resumo diário", meses_disponiveis, format_func=str)
+
+    # Comparação entre Periods (inteiros), sem converter datas em texto
+    resumo_dia_mes = resumo_dia[resumo_dia["Mês"] == mes_selecionado]
+
+    st.subheader(f"📆 Resumo Diário de {mes_selecionado}")
+    
+    # Adicionar indicador de meta no resumo diário
+    if nova_meta > 0:
+        resumo_dia_mes = resumo_dia_mes.copy()
+        resumo_dia_mes["Meta Atingida"] = resumo_dia_mes["Total (R$)"] >= nova_meta
+        percentual = resumo_dia_mes["Total (R$)"].to_numpy() / nova_meta * 100
+        # Arredonda só o que é exibido; a faixa usa o valor exato (99,96% não vira 🟢)
+        resumo_dia_mes["% da Meta"] = percentual.round(1)
+        # Indicador por faixa em uma única busca vetorizada, sem callback por célula
+        resumo_dia_mes["Status"] = STATUS_META[np.searchsorted(FAIXAS_META, percentual, side="right")]
+        
+        st.dataframe(
+            resumo_dia_mes.drop(columns=["Mês"]),
+            column_config={
+                **COLUNAS_RESUMO,
+                "% da Meta": st.column_config.NumberColumn("% da Meta", format="%.1f%%")
+            },
+            use_container_width=True
+        )
+    else:
+        st.dataframe(resumo_dia_mes.drop(columns=["Mês"]), column_config=COLUNAS_RESUMO, use_container_width=True)
+
+    # Gráfico diário com linha de meta
+    # Só as colunas plotadas entram na chave do cache do gráfico
+    fig_dia_mes = grafico_diario(resumo_dia_mes[["Data", "Total (R$)"]], str(mes_selecionado), nova_meta)
+    st.plotly_chart(fig_dia_mes, use_container_width=True)
+
 def tela_principal():
     """Tela principal do sistema"""
     # Cabeçalho com informações do usuário
@@ -246,9 +562,6 @@ def tela_principal():
     # Mostrar progresso da meta diária
     df = carregar_dados_usuario(st.session_state.usuario_atual)
     if not df.empty:
-        df["Data"] = pd.to_datetime(df["Data"], errors="coerce")
-        df = df.dropna(subset=["Data"])
-        
         if nova_meta > 0:
             progresso_meta = calcular_progresso_meta(df, nova_meta)
             
@@ -292,190 +605,77 @@ def tela_principal():
         enviado = st.form_submit_button("Adicionar rendimento")
 
         if enviado and valor != 0:
-            # Recarregar dados do arquivo para garantir consistência
-            df_atual = carregar_dados_usuario(st.session_state.usuario_atual)
-            novo_dado = pd.DataFrame({"Data": [data], "Valor": [valor]})
-            df_atualizado = pd.concat([df_atual, novo_dado], ignore_index=True)
+            # Acrescenta a linha nos dados já carregados (sem reler nem concatenar)
+            df.loc[len(df)] = (pd.Timestamp(data), valor)
             
-            if salvar_dados_usuario(st.session_state.usuario_atual, df_atualizado):
+            if salvar_dados_usuario(st.session_state.usuario_atual, df):
                 st.success("✅ Rendimento adicionado com sucesso!")
                 st.rerun()
 
-    # --- Carregamento dos dados ---
-    df = carregar_dados_usuario(st.session_state.usuario_atual)
-
+    # --- Dados já carregados no início da tela ---
     if not df.empty:
-        df["Data"] = pd.to_datetime(df["Data"], errors="coerce")
-        df = df.dropna(subset=["Data"])
         df = df.sort_values("Data").reset_index(drop=True)
 
         st.subheader("📅 Gerenciar Rendimentos")
 
-        # Criar uma cópia limpa para edição
-        df_editavel = df.copy()
-        df_editavel["Excluir"] = False
-
-        # Usar uma chave única para o data_editor
-        df_editado = st.data_editor(
-            df_editavel,
-            use_container_width=True,
-            num_rows="dynamic",
-            hide_index=True,
-            key="editor_rendimentos",
-            column_config={
-                "Data": st.column_config.DateColumn("Data"),
-                "Valor": st.column_config.NumberColumn("Valor (R$)", format="%.2f"),
-                "Excluir": st.column_config.CheckboxColumn("Excluir")
-            }
-        )
+        # O editor manda a tabela inteira ao navegador e de volta a cada rerun;
+        # só é montado quando o usuário pede para editar
+        if st.toggle("✏️ Editar registros", key="editar_registros"):
+            # Criar uma cópia limpa para edição (Excluir já nasce como bool nativo)
+            df_editavel = df.assign(Excluir=np.zeros(len(df), dtype=bool))
+
+            # Usar uma chave única para o data_editor
+            df_editado = st.data_editor(
+                df_editavel,
+                use_container_width=True,
+                num_rows="dynamic",
+                hide_index=True,
+                key="editor_rendimentos",
+                column_config={
+                    "Data": st.column_config.DateColumn("Data"),
+                    "Valor": st.column_config.NumberColumn("Valor (R$)", format="%.2f"),
+                    "Excluir": st.column_config.CheckboxColumn("Excluir", default=False)
+                }
+            )
 
-        col1, col2, col3 = st.columns(3)
-        
-        with col1:
-            if st.button("💾 Salvar alterações", key="salvar_alteracoes"):
-                # Filtrar dados não marcados para exclusão
-                df_salvo = df_editado[df_editado["Excluir"] == False].drop(columns=["Excluir"])
-                
-                # Validar e limpar dados
-                df_salvo = df_salvo.copy()
-                df_salvo["Data"] = pd.to_datetime(df_salvo["Data"], errors="coerce")
-                df_salvo = df_salvo.dropna(subset=["Data"])
-                
-                if not df_salvo.empty:
-                    if salvar_dados_usuario(st.session_state.usuario_atual, df_salvo):
-                        st.success("✅ Alterações salvas com sucesso!")
-                        st.rerun()
-                else:
-                    st.warning("⚠️ Nenhum dado válido para salvar.")
+            # Máscara de exclusão avaliada uma única vez e reaproveitada abaixo
+            manter = ~df_editado["Excluir"].to_numpy(dtype=bool)
+            itens_excluir = int(len(manter) - manter.sum())
+            df_ativos = df_editado.iloc[manter].drop(columns=["Excluir"])
 
-        with col2:
-            if st.button("🗑️ Excluir selecionados", key="excluir_selecionados"):
-                # Contar quantos itens serão excluídos
-                itens_excluir = df_editado["Excluir"].sum()
-                
-                if itens_excluir > 0:
-                    df_restante = df_editado[df_editado["Excluir"] == False].drop(columns=["Excluir"])
-                    
-                    if not df_restante.empty:
-                        if salvar_dados_usuario(st.session_state.usuario_atual, df_restante):
-                            st.success(f"✅ {itens_excluir} registro(s) excluído(s) com sucesso!")
-                            st.rerun()
-                    else:
-                        # Se não há dados restantes, criar arquivo vazio
-                        df_vazio = pd.DataFrame(columns=["Data", "Valor"])
-                        caminho_arquivo = get_caminho_dados_usuario(st.session_state.usuario_atual)
-                        df_vazio.to_csv(caminho_arquivo, index=False)
-                        st.success(f"✅ Todos os registros foram excluídos!")
-                        st.rerun()
-                else:
-                    st.warning("⚠️ Nenhum item selecionado para exclusão.")
+            # O editor preserva datetime64 nas linhas existentes; só linhas novas
+            # podem chegar como objeto, então a conversão acontece uma única vez aqui
+            if df_ativos["Data"].dtype.kind != "M":
+                df_ativos["Data"] = pd.to_datetime(df_ativos["Data"], errors="coerce")
+            df_ativos = df_ativos.dropna(subset=["Data"])
 
-        with col3:
-            # Mostrar estatísticas rápidas
-            total_registros = len(df)
-            total_valor = df["Valor"].sum()
-            st.metric("📊 Total de Registros", total_registros)
-            st.metric("💰 Total Acumulado", f"R$ {total_valor:.2f}")
+            acoes_rendimentos(df_ativos, itens_excluir, df)
+        else:
+            df_ativos = df
+            mostrar_totais(df)
 
         # --- Processar dados para resumos ---
-        df_para_resumo = df_editado[df_editado["Excluir"] == False].drop(columns=["Excluir"])
-        
-        if not df_para_resumo.empty:
-            df_para_resumo["Data"] = pd.to_datetime(df_para_resumo["Data"], errors="coerce")
-            df_para_resumo = df_para_resumo.dropna(subset=["Data"])
-            
-            df_para_resumo["Dia"] = df_para_resumo["Data"].dt.date
-            df_para_resumo["Semana"] = df_para_resumo["Data"].dt.isocalendar().week
-            df_para_resumo["Mês"] = df_para_resumo["Data"].dt.to_period("M").astype(str)
+        if not df_ativos.empty:
+            resumo_dia, resumo_semana, resumo_mes = calcular_resumos(df_ativos)
 
             # --- Resumo Diário com filtro por mês ---
-            resumo_dia = df_para_resumo.groupby("Dia")["Valor"].sum().reset_index()
-            resumo_dia.columns = ["Data", "Total (R$)"]
-            resumo_dia["Mês"] = resumo_dia["Data"].astype(str).str.slice(0, 7)
-
             if not resumo_dia.empty:
                 st.subheader("📈 Relatórios e Análises")
                 
-                meses_disponiveis = sorted(resumo_dia["Mês"].unique(), reverse=True)
-                mes_selecionado = st.selectbox("Selecione o mês para ver o resumo diário", meses_disponiveis)
-
-                resumo_dia_mes = resumo_dia[resumo_dia["Mês"] == mes_selecionado]
-
-                st.subheader(f"📆 Resumo Diário de {mes_selecionado}")
-                
-                # Adicionar indicador de meta no resumo diário
-                if nova_meta > 0:
-                    resumo_dia_mes = resumo_dia_mes.copy()
-                    resumo_dia_mes["Meta Atingida"] = resumo_dia_mes["Total (R$)"] >= nova_meta
-                    resumo_dia_mes["% da Meta"] = (resumo_dia_mes["Total (R$)"] / nova_meta * 100).round(1)
-                    
-                    st.dataframe(
-                        resumo_dia_mes.drop(columns=["Mês"]).style.format({
-                            "Total (R$)": "R$ {:.2f}",
-                            "% da Meta": "{:.1f}%"
-                        }).applymap(
-                            lambda x: 'color: green' if x == True else 'color: red' if x == False else '',
-                            subset=["Meta Atingida"]
-                        ),
-                        use_container_width=True
-                    )
-                else:
-                    st.dataframe(resumo_dia_mes.drop(columns=["Mês"]).style.format({"Total (R$)": "R$ {:.2f}"}), use_container_width=True)
-
-                # Gráfico diário com linha de meta
-                fig_dia_mes = px.line(
-                    resumo_dia_mes,
-                    x="Data",
-                    y="Total (R$)",
-                    title=f"Rendimento Diário em {mes_selecionado}",
-                    labels={"Data": "Data", "Total (R$)": "Total (R$)"}
-                )
-                fig_dia_mes.update_traces(mode="lines+markers")
-                
-                # Adicionar linha de meta se definida
-                if nova_meta > 0:
-                    fig_dia_mes.add_hline(
-                        y=nova_meta,
-                        line_dash="dash",
-                        line_color="red",
-                        annotation_text=f"Meta Diária: R$ {nova_meta:.2f}"
-                    )
-                
-                fig_dia_mes.update_layout(yaxis_title="Total (R$)", xaxis_title="Data", xaxis_tickformat="%d/%m/%Y")
-                st.plotly_chart(fig_dia_mes, use_container_width=True)
+                resumo_diario_do_mes(resumo_dia, nova_meta)
 
             # --- Resumo Semanal ---
             st.subheader("🗓️ Resumo Semanal")
-            resumo_semana = df_para_resumo.groupby("Semana")["Valor"].sum().reset_index()
-            resumo_semana.columns = ["Semana", "Total (R$)"]
-            st.dataframe(resumo_semana.style.format({"Total (R$)": "R$ {:.2f}"}))
-
-            fig_semana = px.line(
-                resumo_semana,
-                x="Semana",
-                y="Total (R$)",
-                title="Rendimento Semanal",
-                labels={"Semana": "Semana do Ano", "Total (R$)": "Total (R$)"}
-            )
-            fig_semana.update_traces(mode="markers+lines")
+            st.dataframe(resumo_semana, column_config=COLUNAS_RESUMO)
+
+            fig_semana = grafico_semanal(resumo_semana)
             st.plotly_chart(fig_semana, use_container_width=True)
 
             # --- Resumo Mensal ---
             st.subheader("📅 Resumo Mensal")
-            resumo_mes = df_para_resumo.groupby("Mês")["Valor"].sum().reset_index()
-            resumo_mes.columns = ["Mês", "Total (R$)"]
-            st.dataframe(resumo_mes.style.format({"Total (R$)": "R$ {:.2f}"}))
-
-            fig_mes = px.bar(
-                resumo_mes,
-                x="Mês",
-                y="Total (R$)",
-                title="Rendimento Mensal",
-                labels={"Mês": "Mês", "Total (R$)": "Total (R$)"},
-                text="Total (R$)"
-            )
-            fig_mes.update_traces(texttemplate="R$ %{text:.2f}", textposition="outside")
-            fig_mes.update_layout(yaxis_title="Total (R$)", xaxis_title="Mês")
+            st.dataframe(resumo_mes, column_config=COLUNAS_RESUMO)
+
+            fig_mes = grafico_mensal(resumo_mes)
             st.plotly_chart(fig_mes, use_container_width=True)
 
     else: